@@ -5,7 +5,36 @@ Simple CLI interface for generating YouTube video scripts
 
 import argparse
 import os
-from script_generator import VideoScriptGenerator
+import sys
+from script_generator import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MODEL,
+    DEFAULT_TEMPERATURE,
+    VARIATION_TEMPERATURE,
+    VideoScriptGenerator,
+)
+
+
+# --format choices mapped to the formats passed to save_script
+OUTPUT_FORMATS = {
+    'json': ('json',),
+    'txt': ('txt',),
+    'both': ('json', 'txt'),
+}
+
+
+def progress_printer():
+    """Build an on_token callback that shows how much of the script has arrived"""
+    received = 0
+    
+    def on_token(text):
+        nonlocal received
+        received += len(text)
+        sys.stdout.write(f"\r✍️  Writing script... {received} characters received")
+        sys.stdout.flush()
+    
+    return on_token
 
 
 def main():
@@ -18,55 +47,76 @@ def main():
     parser.add_argument('--requirements', default='', help='Additional requirements for the script')
     parser.add_argument('--variations', type=int, default=1, help='Number of script variations to generate (default: 1)')
     parser.add_argument('--output', help='Output filename (optional)')
+    parser.add_argument('--model', default=DEFAULT_MODEL,
+                        help=f'OpenAI model to use; JSON mode is used when the model supports it (default: {DEFAULT_MODEL})')
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE,
+                        help=f'Sampling temperature; variations use at least {VARIATION_TEMPERATURE} (default: {DEFAULT_TEMPERATURE})')
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS,
+                        help=f'Maximum script length in tokens (default: {DEFAULT_MAX_TOKENS})')
+    parser.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='json', help='File format(s) to save (default: json)')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the API, even if this exact script was generated before')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f'Maximum parallel requests when generating variations (default: {DEFAULT_MAX_CONCURRENCY})')
     
     args = parser.parse_args()
     
     try:
         # Initialize generator
-        generator = VideoScriptGenerator()
-        
-        print(f"🎬 Generating script(s) for: {args.topic}")
-        print(f"📏 Length: {args.length}")
-        print(f"🎭 Style: {args.style}")
-        print(f"👥 Audience: {args.audience}")
-        
-        if args.variations > 1:
-            print(f"🔄 Creating {args.variations} variations...")
+        with VideoScriptGenerator(
+            model=args.model,
+            temperature=args.temperature,
+            max_tokens=args.max_tokens,
+            max_concurrency=args.max_concurrency
+        ) as generator:
+            
+            print(f"🎬 Generating script(s) for: {args.topic}")
+            print(f"📏 Length: {args.length}")
+            print(f"🎭 Style: {args.style}")
+            print(f"👥 Audience: {args.audience}")
+            print(f"🤖 Model: {args.model}")
+            
+            if args.variations > 1:
+                print(f"🔄 Creating {args.variations} variations...")
+            
+                scripts = generator.generate_multiple_variations(
+                    topic=args.topic,
+                    count=args.variations,
+                    video_length=args.length,
+                    style=args.style,
+                    target_audience=args.audience,
+                    additional_requirements=args.requirements,
+                    save=True,
+                    filename=args.output,
+                    formats=OUTPUT_FORMATS[args.format]
+                )
             
-            scripts = generator.generate_multiple_variations(
-                topic=args.topic,
-                count=args.variations,
-                video_length=args.length,
-                style=args.style,
-                target_audience=args.audience,
-                additional_requirements=args.requirements
-            )
+                for script in scripts:
+                    print(f"✅ Variation {script['variation']} saved to: {script['saved_to']}")
             
-            for i, script in enumerate(scripts, 1):
-                filename = generator.save_script(script, 
-                    args.output.replace('.', f'_v{i}.') if args.output else None)
-                print(f"✅ Variation {i} saved to: {filename}")
-        
-        else:
-            script = generator.generate_script(
-                topic=args.topic,
-                video_length=args.length,
-                style=args.style,
-                target_audience=args.audience,
-                additional_requirements=args.requirements
-            )
+            else:
+                script = generator.generate_script(
+                    topic=args.topic,
+                    video_length=args.length,
+                    style=args.style,
+                    target_audience=args.audience,
+                    additional_requirements=args.requirements,
+                    use_cache=not args.no_cache,
+                    on_token=progress_printer()
+                )
+                print()
             
-            filename = generator.save_script(script, args.output)
-            print(f"✅ Script saved to: {filename}")
+                filename = generator.save_script(script, args.output, OUTPUT_FORMATS[args.format])
+                print(f"✅ Script saved to: {filename}")
             
-            # Show preview
-            print("\n" + "="*60)
-            print("📝 SCRIPT PREVIEW:")
-            print("="*60)
-            preview = script['full_script'][:400] + "..." if len(script['full_script']) > 400 else script['full_script']
-            print(preview)
-            print("="*60)
-            print(f"💡 Full script saved to {filename}")
+                # Show preview
+                print("\n" + "="*60)
+                print("📝 SCRIPT PREVIEW:")
+                print("="*60)
+                full_script = script['full_script']
+                preview = full_script[:400] + ("..." if len(full_script) > 400 else "")
+                print(preview)
+                print("="*60)
+                print(f"💡 Full script saved to {filename}")
     
     except Exception as e:
         print(f"❌ Error: {e}")
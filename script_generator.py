@@ -4,28 +4,159 @@ YouTube Video Script Generator using ChatGPT
 Automates the creation of video scripts using OpenAI's ChatGPT API
 """
 
+import asyncio
+import hashlib
 import openai
 import json
 import os
+import random
+import re
 from datetime import datetime
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
+import aiofiles
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used without it
+    orjson = None
+
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 2000
+# Streamed requests time out between chunks; non-streamed ones only respond once the whole
+# completion is done, so their timeout also allows for the slowest expected generation speed
+REQUEST_TIMEOUT_SECONDS = 60.0
+MIN_TOKENS_PER_SECOND = 10
+
+# Concurrency and retry settings for batched (async) generation
+VARIATION_TEMPERATURE = 0.9
+MAX_CHOICES_PER_REQUEST = 128
+DEFAULT_MAX_CONCURRENCY = 8
+MAX_RETRIES = 5
+MAX_BACKOFF_SECONDS = 60
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Generated responses are cached on disk, keyed on model, temperature, max tokens and prompt
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "ytscript")
+
+# File formats save_script can write
+SAVE_FORMATS = ("json", "txt")
+
+# Characters dropped from the topic when building a default filename; keeps letters, digits, spaces, '-' and '_'
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w \-]+')
+
+# Prompt sent with every request; filled in by _build_prompt. The model is asked for JSON
+# (enforced with JSON_RESPONSE_FORMAT) so the sections can be read without scraping markdown.
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Older chat models reject JSON_RESPONSE_FORMAT with a 400 error. They are still prompted for JSON,
+# and _parse_script_response extracts the object from any prose or code fences around it.
+MODELS_WITHOUT_JSON_MODE = frozenset({
+    "gpt-4", "gpt-4-0314", "gpt-4-0613",
+    "gpt-4-32k", "gpt-4-32k-0314", "gpt-4-32k-0613",
+    "gpt-3.5-turbo-0301", "gpt-3.5-turbo-0613",
+    "gpt-3.5-turbo-16k", "gpt-3.5-turbo-16k-0613",
+})
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a professional YouTube script writer who creates engaging, well-structured video scripts."}
+PROMPT_TEMPLATE = """
+Create a YouTube video script with the following specifications:
+
+**Topic**: {topic}
+**Video Length**: {video_length}
+**Style**: {style}
+**Target Audience**: {target_audience}
+**Additional Requirements**: {additional_requirements}
+
+Respond with a JSON object containing exactly these keys, each holding the script text for that section.
+Every value must be a single plain string, not a nested object or list; separate parts of a section with line breaks inside the string.
+
+- "hook": First 15 seconds - grab attention
+- "introduction": Introduce yourself and the topic
+- "main_content": Core content broken into clear sections
+- "call_to_action": Subscribe, like, comment prompts
+- "outro": Wrap up and next video tease
+
+Within each section's text, include:
+- The actual script text
+- [Stage directions/notes in brackets]
+- Estimated timing
+
+Make the script engaging, conversational, and optimized for YouTube retention. Include natural pauses and emphasis points.
+"""
+
+# Script sections returned by the model, keyed by the heading used for them in full_script
+SECTION_KEYS = {
+    "HOOK": "hook",
+    "INTRODUCTION": "introduction",
+    "MAIN CONTENT": "main_content",
+    "CALL TO ACTION": "call_to_action",
+    "OUTRO": "outro",
+}
 
 class VideoScriptGenerator:
-    def __init__(self, api_key: str = None):
-        """Initialize the script generator with OpenAI API key"""
+    def __init__(self,
+                 api_key: str = None,
+                 model: str = DEFAULT_MODEL,
+                 temperature: float = DEFAULT_TEMPERATURE,
+                 max_tokens: int = DEFAULT_MAX_TOKENS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 tokens_per_minute: Optional[int] = None,
+                 cache_dir: str = DEFAULT_CACHE_DIR,
+                 json_mode: Optional[bool] = None):
+        """
+        Initialize the script generator with OpenAI API key
+        
+        Args:
+            api_key: OpenAI API key (defaults to the OPENAI_API_KEY environment variable)
+            model: OpenAI chat model; smaller models such as gpt-4o-mini are much faster than gpt-4
+            temperature: Sampling temperature for single scripts; variations use at least VARIATION_TEMPERATURE
+            max_tokens: Maximum length of each generated script, in tokens
+            max_concurrency: Maximum number of requests in flight when generating variations;
+                size this to your OpenAI rate-limit tier
+            tokens_per_minute: Optional TPM limit of your tier, used to further cap in-flight requests
+            cache_dir: Directory holding cached responses for repeated prompts
+            json_mode: Send response_format=json_object with each request; by default it is
+                enabled for every model except those in MODELS_WITHOUT_JSON_MODE
+        """
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass it directly.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
         
-        openai.api_key = self.api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.json_mode = model not in MODELS_WITHOUT_JSON_MODE if json_mode is None else json_mode
+        
+        # Reused for every request so connections are kept alive between calls
+        self._client = OpenAI(api_key=self.api_key)
+    
+    def close(self) -> None:
+        """Close the underlying HTTP connections"""
+        self._client.close()
+    
+    def __enter__(self) -> "VideoScriptGenerator":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def generate_script(self, 
                        topic: str, 
                        video_length: str = "5-10 minutes",
                        style: str = "educational",
                        target_audience: str = "general",
-                       additional_requirements: str = "") -> Dict[str, str]:
+                       additional_requirements: str = "",
+                       use_cache: bool = True,
+                       on_token: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
         """
         Generate a video script using ChatGPT
         
@@ -35,6 +166,8 @@ class VideoScriptGenerator:
             style: Style of the video (educational, entertaining, tutorial, etc.)
             target_audience: Target audience description
             additional_requirements: Any additional specific requirements
+            use_cache: Reuse the response of an earlier identical request instead of calling the API
+            on_token: Optional callback receiving the raw JSON response as it streams in
         
         Returns:
             Dictionary containing the generated script components
@@ -42,127 +175,414 @@ class VideoScriptGenerator:
         
         prompt = self._build_prompt(topic, video_length, style, target_audience, additional_requirements)
         
+        cache_key = self._cache_key(prompt)
+        if use_cache:
+            cached_content = self._read_cache(cache_key)
+            if cached_content is not None:
+                if on_token:
+                    on_token(cached_content)
+                return self._parse_script_response(cached_content, topic)
+        
+        parts = []
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a professional YouTube script writer who creates engaging, well-structured video scripts."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.7
+            stream = self._client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                **self._response_format(),
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                stream=True
             )
-            
-            script_content = response.choices[0].message.content
-            
-            # Parse and structure the response
-            script_data = self._parse_script_response(script_content, topic)
-            
-            return script_data
-            
-        except Exception as e:
-            raise Exception(f"Error generating script: {str(e)}")
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    parts.append(delta)
+                    if on_token:
+                        on_token(delta)
+        except openai.APIError as e:
+            raise Exception(f"Error generating script: {str(e)}") from e
+        
+        script_content = "".join(parts)
+        
+        # Parse and structure the response; only cache it once it is known to be valid
+        script_data = self._parse_script_response(script_content, topic)
+        
+        if use_cache:
+            self._write_cache(cache_key, script_content)
+        
+        return script_data
+    
+    async def _agenerate_choices(self,
+                                 client: AsyncOpenAI,
+                                 prompt: str,
+                                 n: int,
+                                 request_slots: asyncio.Semaphore,
+                                 token_slots: asyncio.Semaphore) -> List[str]:
+        """Sample n scripts for the prompt in a single request, throttled by the batch's rate-limit semaphores"""
+        
+        try:
+            async with request_slots, token_slots:
+                response = await self._acreate_with_retry(
+                    client,
+                    model=self.model,
+                    messages=self._build_messages(prompt),
+                    max_tokens=self.max_tokens,
+                    temperature=max(self.temperature, VARIATION_TEMPERATURE),
+                    **self._response_format(),
+                    timeout=self._completion_timeout(),
+                    n=n
+                )
+        except openai.APIError as e:
+            raise Exception(f"Error generating script: {str(e)}") from e
+        
+        return [choice.message.content for choice in response.choices]
+    
+    def _completion_timeout(self) -> float:
+        """Timeout for a non-streamed request, long enough for a full max_tokens completion"""
+        
+        return max(REQUEST_TIMEOUT_SECONDS, self.max_tokens / MIN_TOKENS_PER_SECOND)
+    
+    def _response_format(self) -> Dict[str, Dict[str, str]]:
+        """Extra request parameters enforcing a JSON reply, empty for models without JSON mode"""
+        
+        return {"response_format": JSON_RESPONSE_FORMAT} if self.json_mode else {}
+    
+    async def _acreate_with_retry(self, client: AsyncOpenAI, **params):
+        """Create a chat completion, backing off with full jitter on rate limits and transient errors"""
+        
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await client.chat.completions.create(**params)
+            except RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                await asyncio.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, 2 ** attempt)))
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether retrying can help; timeouts and some 429s are not worth another attempt"""
+        
+        # A timed-out completion may well have been generated and billed, so do not pay for it again
+        if isinstance(error, openai.APITimeoutError):
+            return False
+        if isinstance(error, openai.RateLimitError):
+            # "Request too large" means the request alone exceeds the limit, and an exhausted
+            # quota does not refill on its own, so backing off would only burn time
+            if "request too large" in str(error).lower() or error.code == "insufficient_quota":
+                return False
+        return True
+    
+    def _cache_key(self, prompt: str) -> str:
+        """Hash everything that determines the response into a cache key"""
+        
+        return hashlib.sha256(f"{self.model}|{self.temperature}|{self.max_tokens}|{prompt}".encode('utf-8')).hexdigest()
+    
+    def _read_cache(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or if the cache cannot be read"""
+        
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.txt"), 'r', encoding='utf-8') as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+    
+    def _write_cache(self, key: str, content: str) -> None:
+        """Store a response in the cache; failures are ignored since caching is best-effort"""
+        
+        path = os.path.join(self.cache_dir, f"{key}.txt")
+        
+        # Write to a temporary file first so a concurrent reader never sees a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            # An unwritable cache (read-only home, full disk, ...) must not lose a paid-for script
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Build the chat messages sent to ChatGPT for a given prompt"""
+        
+        return [SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
     
     def _build_prompt(self, topic: str, video_length: str, style: str, target_audience: str, additional_requirements: str) -> str:
         """Build the ChatGPT prompt for script generation"""
         
-        prompt = f"""
-Create a YouTube video script with the following specifications:
-
-**Topic**: {topic}
-**Video Length**: {video_length}
-**Style**: {style}
-**Target Audience**: {target_audience}
-**Additional Requirements**: {additional_requirements}
-
-Please structure the script with the following sections:
-
-1. **HOOK** (First 15 seconds - grab attention)
-2. **INTRODUCTION** (Introduce yourself and the topic)
-3. **MAIN CONTENT** (Core content broken into clear sections)
-4. **CALL TO ACTION** (Subscribe, like, comment prompts)
-5. **OUTRO** (Wrap up and next video tease)
-
-For each section, provide:
-- The actual script text
-- [Stage directions/notes in brackets]
-- Estimated timing
-
-Make the script engaging, conversational, and optimized for YouTube retention. Include natural pauses and emphasis points.
-"""
-        
-        return prompt
+        return PROMPT_TEMPLATE.format(
+            topic=topic,
+            video_length=video_length,
+            style=style,
+            target_audience=target_audience,
+            additional_requirements=additional_requirements
+        )
     
-    def _parse_script_response(self, response: str, topic: str) -> Dict[str, str]:
-        """Parse the ChatGPT response into structured script data"""
+    def _parse_script_response(self, response: str, topic: str, generated_at: Optional[str] = None) -> Dict[str, str]:
+        """Parse the ChatGPT JSON response into structured script data, stamped with generated_at (default: now)"""
+        
+        data = self._load_json_object(response)
+        
+        sections = {key: self._section_text(data.get(key, "")) for key in SECTION_KEYS.values()}
+        
+        # Readable version of the whole script, as saved to the text file
+        full_script = "\n\n".join(f"**{heading}**\n{sections[key]}" for heading, key in SECTION_KEYS.items())
         
         return {
             "topic": topic,
-            "generated_at": datetime.now().isoformat(),
-            "full_script": response,
-            "hook": self._extract_section(response, "HOOK"),
-            "introduction": self._extract_section(response, "INTRODUCTION"),
-            "main_content": self._extract_section(response, "MAIN CONTENT"),
-            "call_to_action": self._extract_section(response, "CALL TO ACTION"),
-            "outro": self._extract_section(response, "OUTRO")
+            "generated_at": generated_at or datetime.now().isoformat(),
+            "full_script": full_script,
+            **sections
         }
     
-    def _extract_section(self, text: str, section_name: str) -> str:
-        """Extract a specific section from the script text"""
+    def _load_json_object(self, response: str) -> Dict:
+        """Decode the JSON object in a response, raising ValueError if there is none"""
+        
         try:
-            # Simple extraction - look for section headers
-            lines = text.split('\n')
-            section_lines = []
-            in_section = False
-            
-            for line in lines:
-                if section_name.upper() in line.upper() and ('**' in line or '#' in line):
-                    in_section = True
-                    continue
-                elif in_section and ('**' in line or '#' in line) and any(keyword in line.upper() for keyword in ['HOOK', 'INTRODUCTION', 'MAIN', 'CALL', 'OUTRO']):
-                    break
-                elif in_section:
-                    section_lines.append(line)
-            
-            return '\n'.join(section_lines).strip()
-        except:
-            return "Section not found"
-    
-    def save_script(self, script_data: Dict[str, str], filename: str = None) -> str:
-        """Save the generated script to a file"""
+            data = json.loads(response)
+        except json.JSONDecodeError as e:
+            # Without JSON mode the object may be wrapped in a code fence or a sentence of prose
+            start, end = response.find('{'), response.rfind('}')
+            if start == -1 or end < start:
+                raise ValueError(f"Script response is not valid JSON (it may have been cut off by max_tokens): {e}") from e
+            try:
+                data = json.loads(response[start:end + 1])
+            except json.JSONDecodeError:
+                raise ValueError(f"Script response is not valid JSON (it may have been cut off by max_tokens): {e}") from e
+        
+        if not isinstance(data, dict):
+            raise ValueError("Script response is not a JSON object.")
+        return data
+    
+    def _section_text(self, value) -> str:
+        """Normalize a section from the JSON response to plain text"""
+        
+        # The prompt asks for plain strings, but the model occasionally splits a long section into
+        # a list of paragraphs or of {"title": ..., "text": ...} objects; flatten those to their text
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return "\n\n".join(filter(None, (self._section_text(item) for item in value)))
+        if isinstance(value, dict):
+            return "\n".join(filter(None, (self._section_text(item) for item in value.values())))
+        return str(value).strip()
+    
+    def save_script(self,
+                    script_data: Dict[str, str],
+                    filename: str = None,
+                    formats: Sequence[str] = ("json",)) -> str:
+        """
+        Save the generated script to a file
+        
+        Args:
+            script_data: Script as returned by generate_script
+            filename: JSON filename (defaults to a name built from the topic)
+            formats: Any of "json" (structured data) and "txt" (readable text)
+        
+        Returns:
+            Path of the JSON file, or of the text file if only "txt" was requested
+        """
+        
+        json_filename, text_filename = self._save_paths(script_data, filename, formats)
+        
+        if json_filename:
+            with open(json_filename, 'wb') as f:
+                f.write(self._encode_json(script_data))
+        
+        if text_filename:
+            with open(text_filename, 'w', encoding='utf-8') as f:
+                f.write(self._format_text(script_data))
+        
+        return json_filename or text_filename
+    
+    async def asave_script(self,
+                           script_data: Dict[str, str],
+                           filename: str = None,
+                           formats: Sequence[str] = ("json",)) -> str:
+        """Save the generated script to a file without blocking the event loop (see save_script)"""
+        
+        json_filename, text_filename = self._save_paths(script_data, filename, formats)
+        
+        if json_filename:
+            async with aiofiles.open(json_filename, 'wb') as f:
+                await f.write(self._encode_json(script_data))
+        
+        if text_filename:
+            async with aiofiles.open(text_filename, 'w', encoding='utf-8') as f:
+                await f.write(self._format_text(script_data))
+        
+        return json_filename or text_filename
+    
+    def _save_paths(self,
+                    script_data: Dict[str, str],
+                    filename: Optional[str],
+                    formats: Sequence[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Resolve the JSON and text paths to write, None for formats that were not requested"""
+        
+        unknown = set(formats) - set(SAVE_FORMATS)
+        if unknown or not formats:
+            raise ValueError(f"formats must be a non-empty selection of {SAVE_FORMATS}, got {tuple(formats)}")
         
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_topic = "".join(c for c in script_data['topic'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            filename = f"script_{safe_topic.replace(' ', '_')}_{timestamp}.json"
-        
-        # Save as JSON
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(script_data, f, indent=2, ensure_ascii=False)
-        
-        # Also save as readable text
-        text_filename = filename.replace('.json', '.txt')
-        with open(text_filename, 'w', encoding='utf-8') as f:
-            f.write(f"YouTube Video Script: {script_data['topic']}\n")
-            f.write(f"Generated: {script_data['generated_at']}\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(script_data['full_script'])
+            filename = self._default_filename(script_data)
+        
+        json_filename = filename if "json" in formats else None
+        text_filename = str(Path(filename).with_suffix('.txt')) if "txt" in formats else None
+        
+        # A .txt filename with both formats would have the text file overwrite the JSON one
+        if json_filename == text_filename:
+            json_filename = str(Path(filename).with_suffix('.json'))
+        
+        return json_filename, text_filename
+    
+    def _encode_json(self, script_data: Dict[str, str]) -> bytes:
+        """Encode script data as indented UTF-8 JSON, using orjson when it is installed"""
+        
+        if orjson is not None:
+            return orjson.dumps(script_data, option=orjson.OPT_INDENT_2)
+        return json.dumps(script_data, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    def _default_filename(self, script_data: Dict[str, str]) -> str:
+        """Build a filename from the script topic, variation number and generation time"""
+        
+        # Use the generation time so every variation of a batch carries the same timestamp
+        timestamp = datetime.fromisoformat(script_data['generated_at']).strftime("%Y%m%d_%H%M%S")
+        safe_topic = UNSAFE_FILENAME_CHARS_RE.sub('', script_data['topic']).strip().replace(' ', '_')
+        filename = f"script_{safe_topic}_{timestamp}.json"
+        
+        # Variations of one batch finish within the same second, so keep their names apart
+        if 'variation' in script_data:
+            filename = self._variation_filename(filename, script_data['variation'])
         
         return filename
     
-    def generate_multiple_variations(self, topic: str, count: int = 3, **kwargs) -> List[Dict[str, str]]:
-        """Generate multiple script variations for the same topic"""
+    def _variation_filename(self, filename: str, variation: int) -> str:
+        """Insert the variation number before the file extension"""
         
-        variations = []
-        for i in range(count):
+        root, ext = os.path.splitext(filename)
+        return f"{root}_v{variation}{ext}"
+    
+    def _format_text(self, script_data: Dict[str, str]) -> str:
+        """Render the script as readable text"""
+        
+        return (
+            f"YouTube Video Script: {script_data['topic']}\n"
+            f"Generated: {script_data['generated_at']}\n"
+            + "=" * 50 + "\n\n"
+            + script_data['full_script']
+        )
+    
+    async def agenerate_multiple_variations(self,
+                                            topic: str,
+                                            count: int = 3,
+                                            video_length: str = "5-10 minutes",
+                                            style: str = "educational",
+                                            target_audience: str = "general",
+                                            additional_requirements: str = "",
+                                            save: bool = False,
+                                            filename: str = None,
+                                            formats: Sequence[str] = ("json",)) -> List[Dict[str, str]]:
+        """
+        Generate multiple script variations for the same topic
+        
+        Variations are sampled together with the API's n= parameter at a higher
+        temperature, so one request covers as many as tokens_per_minute allows (the
+        whole batch when no limit is set). They are never cached, since each one is
+        meant to differ from the others.
+        
+        Args:
+            save: Save each variation as soon as it is generated; the saved
+                filename is stored under the 'saved_to' key
+            filename: Base filename for saved variations; the variation number is
+                appended to it (defaults to a name built from the topic)
+            formats: File formats to save, as in save_script
+        """
+        
+        prompt = self._build_prompt(topic, video_length, style, target_audience, additional_requirements)
+        
+        # All variations are sampled with n= in as few requests as the tokens-per-minute budget
+        # allows, since the prompt is identical; the rest are split into throttled concurrent requests
+        choices_per_request = self._choices_per_request(prompt)
+        batch_sizes = [min(choices_per_request, count - start) for start in range(0, count, choices_per_request)]
+        
+        # Stamp the whole batch once so its variations sort together
+        generated_at = datetime.now().isoformat()
+        
+        # Semaphores are created per batch since each asyncio.run() gets a fresh event loop
+        request_slots = asyncio.Semaphore(self.max_concurrency)
+        token_slots = asyncio.Semaphore(self._token_slots(prompt, choices_per_request))
+        
+        async def finish_variation(content: str, variation: int) -> Dict[str, str]:
+            script = self._parse_script_response(content, topic, generated_at)
+            script['variation'] = variation
+            if save:
+                variation_filename = self._variation_filename(filename, variation) if filename else None
+                script['saved_to'] = await self.asave_script(script, variation_filename, formats)
+            return script
+        
+        async def generate_batch(client: AsyncOpenAI, first_variation: int, n: int) -> List:
             try:
-                script = self.generate_script(topic, **kwargs)
-                script['variation'] = i + 1
-                variations.append(script)
+                contents = await self._agenerate_choices(client, prompt, n, request_slots, token_slots)
             except Exception as e:
-                print(f"Error generating variation {i+1}: {e}")
+                return [e] * n
+            return await asyncio.gather(
+                *[finish_variation(content, first_variation + i) for i, content in enumerate(contents)],
+                return_exceptions=True
+            )
+        
+        # One client per batch so every request shares the same connection pool. The async
+        # client cannot outlive the event loop its connections were opened on, and each
+        # asyncio.run() gets a fresh loop, so it is not kept on the instance.
+        # Retries are handled by _acreate_with_retry, so the SDK's own are disabled.
+        async with AsyncOpenAI(api_key=self.api_key, max_retries=0) as client:
+            batches = await asyncio.gather(*[
+                generate_batch(client, i * choices_per_request + 1, n)
+                for i, n in enumerate(batch_sizes)
+            ])
+        
+        variations = []
+        for i, result in enumerate(result for batch in batches for result in batch):
+            if isinstance(result, Exception):
+                print(f"Error generating variation {i+1}: {result}")
+                continue
+            variations.append(result)
         
         return variations
+    
+    def _choices_per_request(self, prompt: str) -> int:
+        """Largest n= whose completion budget fits in a single minute of the tokens-per-minute limit"""
+        
+        if not self.tokens_per_minute:
+            return MAX_CHOICES_PER_REQUEST
+        
+        # OpenAI counts n * max_tokens against the TPM limit up front, and rejects a request
+        # larger than the whole limit outright
+        available = self.tokens_per_minute - self._estimate_prompt_tokens(prompt)
+        return min(MAX_CHOICES_PER_REQUEST, max(1, available // self.max_tokens))
+    
+    def _token_slots(self, prompt: str, n: int = 1) -> int:
+        """Number of requests that fit in the tokens-per-minute budget at once"""
+        
+        if not self.tokens_per_minute:
+            return self.max_concurrency
+        
+        tokens_per_request = self._estimate_prompt_tokens(prompt) + n * self.max_tokens
+        return max(1, self.tokens_per_minute // tokens_per_request)
+    
+    def _estimate_prompt_tokens(self, prompt: str) -> int:
+        """Rough prompt size in tokens, at ~4 characters per token"""
+        
+        return len(prompt) // 4
+    
+    def generate_multiple_variations(self, topic: str, count: int = 3, **kwargs) -> List[Dict[str, str]]:
+        """Generate multiple script variations for the same topic"""
+        
+        return asyncio.run(self.agenerate_multiple_variations(topic, count, **kwargs))
 
 
 def main():
@@ -203,6 +623,8 @@ def main():
         
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        generator.close()
 
 
 if __name__ == "__main__":